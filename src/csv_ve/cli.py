@@ -3,9 +3,6 @@ from typing import Optional
 
 import typer
 from rich.console import Console
-from textual.theme import BUILTIN_THEMES
-
-from .ui import CSVEditorApp
 
 console = Console()
 csv_ve_cli = typer.Typer()
@@ -40,13 +37,17 @@ def main(
     """
     csv-ve command line
     """
+    # textual and the app (polars, textual) are imported only when needed:
+    # --help and argument errors don't pay for their import
     if theme is not None:
-        available_themes = list(BUILTIN_THEMES.keys())
-        custom_theme_aliases = list(THEME_ALIASES.keys())
-        if theme not in available_themes and theme not in custom_theme_aliases:
+        from textual.theme import BUILTIN_THEMES
+
+        # dict lookups, the names are listed for the error message only
+        if theme not in BUILTIN_THEMES and theme not in THEME_ALIASES:
+            available_themes = BUILTIN_THEMES.keys() | THEME_ALIASES.keys()
             console.print(f"[red]Error: Theme '{theme}' not found[/red]")
             console.print(
-                f"[yellow]Available themes:[/yellow] {', '.join(sorted(available_themes + custom_theme_aliases))}"
+                f"[yellow]Available themes:[/yellow] {', '.join(sorted(available_themes))}"
             )
             raise typer.Exit(1)
 
@@ -61,6 +62,8 @@ def main(
         console.print(f"[red]Error: '{file}' is not a CSV file[/red]")
         raise typer.Exit(1)
 
+    from .ui import CSVEditorApp
+
     app = CSVEditorApp(csv_path=file, theme=resolved_theme)
     app.run()
 
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
 import polars as pl
 
@@ -12,14 +12,114 @@ class CSVDataModel:
 
     def __init__(self, file_path: str):
         self.file_path = Path(file_path)
-        self.df: Optional[pl.DataFrame] = (
-            None  # Lazyframes ?? (maybe later when prototype works with df)
-        )
+        self._df: Optional[pl.DataFrame] = None
+        # inserted rows are appended at the end of _df and deleted rows are left in it,
+        # _row_order holds the position in _df of each displayed row.
+        # The reorder is applied in one gather when df is read
+        self._row_order: Optional[pl.Series] = None
+        # cell edits waiting to be written in _df: {(row position in _df, col index): value}
+        self._pending_edits: dict[tuple[int, int], Any] = {}
+        self._auto_col_counter = 0  # last number used for a generated column name
         self.modified = False
         self.has_header = True
 
         self.load()
 
+    @property
+    def df(self) -> Optional[pl.DataFrame]:
+        """Dataframe in display order (applies the pending cell edits, row inserts and deletes)"""
+        if self._df is not None:
+            if self._pending_edits:
+                self._apply_pending_edits()
+            if self._row_order is not None:
+                self._df = self._df[self._row_order]
+                self._row_order = None
+        return self._df
+
+    @df.setter
+    def df(self, df: Optional[pl.DataFrame]) -> None:
+        self._df = df
+        self._row_order = None
+        self._pending_edits = {}
+
+    @staticmethod
+    def _merged_dtype(series: pl.Series, values: pl.Series) -> pl.DataType:
+        """
+        Type of a column holding both the series and the new values (their supertype,
+        e.g. text typed in a number column turns it into a text column)
+
+        Raises:
+            TypeError: If the values can't be stored in the column
+        """
+        try:
+            merged = pl.concat(
+                [series.head(0).to_frame(), values.alias(series.name).to_frame()],
+                how="vertical_relaxed",
+            )
+        except pl.exceptions.PolarsError as e:
+            raise TypeError(
+                f"Value of type {values.dtype} can't be stored in column "
+                f"'{series.name}' of type {series.dtype}"
+            ) from e
+        return merged.dtypes[0]
+
+    def _apply_pending_edits(self) -> None:
+        """Write the pending cell edits in _df, with one scatter per edited column"""
+        edits_by_col: dict[int, tuple[list[int], list[Any]]] = {}
+        for (row_pos, col_idx), value in self._pending_edits.items():
+            positions, values = edits_by_col.setdefault(col_idx, ([], []))
+            positions.append(row_pos)
+            values.append(value)
+
+        # the edits are dropped even if one fails, so a bad value can't block every later read
+        self._pending_edits = {}
+
+        for col_idx, (positions, values) in edits_by_col.items():
+            series = self._df.to_series(col_idx)
+            new_values = pl.Series(values, strict=False)
+
+            dtype = self._merged_dtype(series, new_values)
+            if series.dtype != dtype:
+                series = series.cast(dtype)
+
+            # write only the edited positions and swap the column in place
+            # (no full-column expression evaluation, no new dataframe)
+            series = series.scatter(positions, new_values.cast(dtype))
+            self._df.replace_column(col_idx, series)
+
+    def iter_rows(self, offset: int, length: int) -> Iterator[tuple[Any, ...]]:
+        """
+        Iterate over a window of rows, in display order.
+        Pending row inserts and cell edits are applied to the window only, not to the dataframe
+
+        Args:
+            offset: Index of the first row of the window
+            length: Number of rows in the window
+        """
+        if self._df is None:
+            return
+
+        if self._row_order is None:
+            window = self._df.slice(offset, length)
+            positions = range(offset, offset + window.height)
+        else:
+            window_order = self._row_order.slice(offset, length)
+            window = self._df[window_order]
+            positions = window_order.to_list()
+
+        # one list per column (column-major): each column is converted in a single pass
+        # and edits are written straight in it, rows are only zipped together at the end
+        columns = [series.to_list() for series in window.get_columns()]
+
+        if self._pending_edits:
+            window_index = {row_pos: i for i, row_pos in enumerate(positions)}
+            for (row_pos, col_idx), value in self._pending_edits.items():
+                i = window_index.get(row_pos)
+                if i is not None:
+                    columns[col_idx][i] = value
+
+        yield from zip(*columns)
+
     # ---basic operations--- #
     def load(self) -> None:
         """
@@ -46,6 +146,7 @@ class CSVDataModel:
     def save(self) -> None:
         """
         Save the data back to the original file
+        The csv is streamed to the file by batches instead of being built in memory at once
 
         Raises:
             RuntimeError: If no data is loaded
@@ -53,13 +154,15 @@ class CSVDataModel:
         if self.df is None:
             raise RuntimeError("No data to save")
 
-        self.df.write_csv(self.file_path)
+        self.df.lazy().sink_csv(self.file_path)
         self.modified = False
 
     # ---edit cells--- #
     def set_cell(self, row_idx: int, col_idx: int, value: Any) -> None:
         """
         Set the value at a specific cell.
+        The edit is recorded and written in the dataframe with the other pending edits
+        when the dataframe is read (see df), e.g. on save
 
         Args:
             row_idx: Row index (0-based)
@@ -68,39 +171,43 @@ class CSVDataModel:
 
         Raises:
             IndexError: If indices are out of bounds
+            TypeError: If the value can't be stored in the column
         """
-        if self.df is None:
+        if self._df is None:
             raise RuntimeError("No data loaded")
 
-        if row_idx < 0 or row_idx >= len(self.df):
+        if row_idx < 0 or row_idx >= self.row_count():
             raise IndexError(f"Row index {row_idx} out of bounds")
 
-        if col_idx < 0 or col_idx >= len(self.df.columns):
+        if col_idx < 0 or col_idx >= self._df.width:
             raise IndexError(f"Column index {col_idx} out of bounds")
 
-        col_name = self.df.columns[col_idx]
-
-        # Create a new dataframe with the updated value
-        # We use a workaround: update the column with a when-then-otherwise expression
-        self.df = self.df.with_columns(
-            pl.when(pl.int_range(pl.len()) == row_idx)
-            .then(pl.lit(value))
-            .otherwise(pl.col(col_name))
-            .alias(col_name)
+        # check the value now rather than when the edits are written
+        self._merged_dtype(
+            self._df.to_series(col_idx), pl.Series([value], strict=False)
         )
 
+        # position of the row in _df (differs from row_idx while row inserts/deletes are pending)
+        row_pos = row_idx if self._row_order is None else self._row_order[row_idx]
+
+        self._pending_edits[(row_pos, col_idx)] = value
+
         self.modified = True
 
     # ---add new row or column--- #
     def row_count(self) -> int:
-        return 0 if self.df is None else len(self.df)
+        if self._df is None:
+            return 0
+        return self._df.height if self._row_order is None else self._row_order.len()
 
     def column_count(self) -> int:
-        return 0 if self.df is None else len(self.df.columns)
+        return 0 if self._df is None else self._df.width
 
     def insert_row(self, row_idx: int, values: Optional[list[Any]] = None) -> None:
         """
         Insert a row at the given index (aka. below the cursor).
+        The row is appended at the end of the dataframe and only its position is recorded,
+        successive inserts are reordered all at once when the dataframe is read (see df)
 
         Args:
             row_idx: Index where the row will be inserted
@@ -109,25 +216,37 @@ class CSVDataModel:
             RuntimeError: If no data is loaded
             IndexError: If index is out of bounds
         """
-        if self.df is None:
+        if self._df is None:
             raise RuntimeError("No data loaded")
 
-        if row_idx < 0 or row_idx > len(self.df):
+        num_rows = self.row_count()
+
+        if row_idx < 0 or row_idx > num_rows:
             raise IndexError(f"Row index {row_idx} out of bounds")
 
-        num_cols = len(self.df.columns)
+        num_cols = self._df.width
+        new_row_pos = self._df.height  # position of the new row in _df
 
         values = [None] * num_cols  # empty rows
 
         new_row = pl.DataFrame(
             [values],
-            schema=self.df.schema,
+            schema=self._df.schema,
+            orient="row",
         )
 
-        top = self.df.slice(0, row_idx)
-        bottom = self.df.slice(row_idx)
-
-        self.df = pl.concat([top, new_row, bottom])
+        row_order = self._row_order
+        if row_order is None:
+            row_order = pl.int_range(num_rows, dtype=pl.UInt32, eager=True)
+
+        self._df.vstack(new_row, in_place=True)
+        self._row_order = pl.concat(
+            [
+                row_order.slice(0, row_idx),
+                pl.Series([new_row_pos], dtype=pl.UInt32),
+                row_order.slice(row_idx),
+            ]
+        )
         self.modified = True
 
     def insert_column(
@@ -147,44 +266,30 @@ class CSVDataModel:
             RuntimeError: If no data is loaded
             IndexError: If index is out of bounds
         """
-        if self.df is None:
+        df = self.df
+        if df is None:
             raise RuntimeError("No data loaded")
 
-        if col_idx < 0 or col_idx > len(self.df.columns):
-            raise IndexError(f"Column index {col_idx} out of bounds")
+        existing_cols = df.columns
+        num_cols = len(existing_cols)
 
-        num_rows = len(self.df)
+        if col_idx < 0 or col_idx > num_cols:
+            raise IndexError(f"Column index {col_idx} out of bounds")
 
         # Generate a unique column name if not provided
+        # (numbering continues from the last generated name instead of restarting at 1)
         if col_name is None:
-            existing_cols = set(self.df.columns)
-            counter = 1
-            col_name = f"Column_{counter}"
+            self._auto_col_counter += 1
+            col_name = f"Column_{self._auto_col_counter}"
             while col_name in existing_cols:
-                counter += 1
-                col_name = f"Column_{counter}"
+                self._auto_col_counter += 1
+                col_name = f"Column_{self._auto_col_counter}"
 
-        values = [None] * num_rows  # empty cols
-
-        # Create new column dataframe
-        new_col_df = pl.DataFrame({col_name: values})
-
-        # Split the dataframe and insert the new column
-        if col_idx == 0:
-            # Insert at the beginning
-            self.df = pl.concat([new_col_df, self.df], how="horizontal")
-        elif col_idx >= len(self.df.columns):
-            # Insert at the end
-            self.df = pl.concat([self.df, new_col_df], how="horizontal")
-        else:
-            # Insert in the middle
-            left_cols = self.df.columns[:col_idx]
-            right_cols = self.df.columns[col_idx:]
-
-            left_df = self.df.select(left_cols)
-            right_df = self.df.select(right_cols)
-
-            self.df = pl.concat([left_df, new_col_df, right_df], how="horizontal")
+        # empty (null) text column, created by polars at the length of the dataframe
+        # then moved from the end to its index
+        new_col = pl.lit(None, dtype=pl.String).alias(col_name)
+        columns = existing_cols[:col_idx] + [col_name] + existing_cols[col_idx:]
+        self.df = df.with_columns(new_col).select(columns)
 
         self.modified = True
 
@@ -192,6 +297,8 @@ class CSVDataModel:
     def delete_row(self, row_idx: int) -> None:
         """
         Delete a row at the given index.
+        Only the position of the row is removed from the row order, the row itself is dropped
+        with the other pending row changes when the dataframe is read (see df)
 
         Args:
             row_idx: Index of the row to delete
@@ -201,19 +308,33 @@ class CSVDataModel:
             IndexError: If index is out of bounds
             ValueError: If trying to delete the last remaining row
         """
-        if self.df is None:
+        if self._df is None:
             raise RuntimeError("No data loaded")
 
-        if row_idx < 0 or row_idx >= len(self.df):
+        num_rows = self.row_count()
+
+        if row_idx < 0 or row_idx >= num_rows:
             raise IndexError(f"Row index {row_idx} out of bounds")
 
-        if len(self.df) == 1:
+        if num_rows == 1:
             raise ValueError("Cannot delete the last remaining row")
 
-        # Create a boolean mask for all rows except the one to delete
-        mask = pl.int_range(pl.len()) != row_idx
-        self.df = self.df.filter(mask)
-
+        row_order = self._row_order
+        if row_order is None:
+            row_order = pl.int_range(num_rows, dtype=pl.UInt32, eager=True)
+
+        # the pending edits of the deleted row are not written anywhere
+        row_pos = row_order[row_idx]
+        if self._pending_edits:
+            self._pending_edits = {
+                key: value
+                for key, value in self._pending_edits.items()
+                if key[0] != row_pos
+            }
+
+        self._row_order = pl.concat(
+            [row_order.slice(0, row_idx), row_order.slice(row_idx + 1)]
+        )
         self.modified = True
 
     def delete_column(self, col_idx: int) -> None:
@@ -228,16 +349,18 @@ class CSVDataModel:
             IndexError: If index is out of bounds
             ValueError: If trying to delete the last remaining column
         """
-        if self.df is None:
+        df = self.df
+        if df is None:
             raise RuntimeError("No data loaded")
 
-        if col_idx < 0 or col_idx >= len(self.df.columns):
+        num_cols = df.width
+
+        if col_idx < 0 or col_idx >= num_cols:
             raise IndexError(f"Column index {col_idx} out of bounds")
 
-        if len(self.df.columns) == 1:
+        if num_cols == 1:
             raise ValueError("Cannot delete the last remaining column")
 
-        col_name = self.df.columns[col_idx]
-        self.df = self.df.drop(col_name)
+        self.df = df.drop(df.columns[col_idx])
 
         self.modified = True
@@ -1,9 +1,88 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
 def col_label_spreasheet_format(index):
     """Convert col index to spreadsheet column label (A, B, C, ... Z, AA, AB, ...)"""
-    label = ""
+    label = bytearray()
     index += 1
     while index > 0:
         index -= 1
-        label = chr(65 + (index % 26)) + label
+        label.append(65 + (index % 26))
         index //= 26
-    return label
+    label.reverse()
+    return label.decode("ascii")
+
+
+def cell_text(value) -> str:
+    """Text of a cell value (text cells, the most common in a csv, are returned as is)"""
+    return value if isinstance(value, str) else str(value)
+
+
+class StaleRows:
+    """
+    Outdated rows of a table, rewritten lazily: the rows from 'start' to 'end' (excluded),
+    except the ones already rewritten since they became outdated ('fresh')
+    """
+
+    def __init__(self) -> None:
+        self.start = 0
+        self.end = 0
+        self.fresh: set[int] = set()
+
+    def __bool__(self) -> bool:
+        return self.start < self.end
+
+    def clear(self) -> None:
+        self.start = self.end = 0
+        self.fresh = set()
+
+    def mark(self, start: int, end: int) -> None:
+        """Rows from 'start' to 'end' (excluded) are outdated"""
+        if start >= end:
+            return
+        if self:
+            self.fresh = {row for row in self.fresh if row < start or row >= end}
+            self.start = min(self.start, start)
+            self.end = max(self.end, end)
+        else:
+            self.start, self.end, self.fresh = start, end, set()
+        self._compact()
+
+    def remove(self, row: int) -> None:
+        """The row was removed from the table, the rows below it moved up"""
+        if not self:
+            return
+        if row < self.start:
+            self.start -= 1
+        if row < self.end:
+            self.end -= 1
+        self.fresh = {r - 1 if r > row else r for r in self.fresh if r != row}
+        self._compact()
+
+    def take(self, start: int, end: int) -> list[tuple[int, int]]:
+        """
+        Outdated rows from 'start' to 'end' (excluded), as (start, end) ranges of consecutive rows.
+        They count as rewritten from now on
+        """
+        ranges: list[tuple[int, int]] = []
+        if not self:
+            return ranges
+        for row in range(max(start, self.start), min(end, self.end)):
+            if row in self.fresh:
+                continue
+            if ranges and ranges[-1][1] == row:
+                ranges[-1] = (ranges[-1][0], row + 1)
+            else:
+                ranges.append((row, row + 1))
+            self.fresh.add(row)
+        self._compact()
+        return ranges
+
+    def _compact(self) -> None:
+        """Move 'start' past the rows already rewritten"""
+        while self.start < self.end and self.start in self.fresh:
+            self.fresh.discard(self.start)
+            self.start += 1
+        if self.start >= self.end:
+            self.clear()
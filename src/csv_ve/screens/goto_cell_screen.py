@@ -1,9 +1,14 @@
+import re
+
 from textual.app import ComposeResult
 from textual.binding import Binding
 from textual.containers import Container
 from textual.screen import ModalScreen
 from textual.widgets import Input, Static
 
+# ROW:COL, each side optional (e.g. 12:3, 12:, :3)
+_COORD_RE = re.compile(r"^\s*(\d*)\s*:\s*(\d*)\s*$")
+
 
 class CoordInputScreen(ModalScreen[tuple[int, int] | None]):
     """Modal screen for navigating to a specific cell."""
@@ -31,7 +36,11 @@ class CoordInputScreen(ModalScreen[tuple[int, int] | None]):
 
     def on_mount(self) -> None:
         """Focus the coordinate input when mounted."""
-        input = self.query_one("#coord_input", Input).focus()
+        # look the widgets up once, not on every submit
+        self._coord_input = self.query_one("#coord_input", Input)
+        self._error_msg = self.query_one("#error_message", Static)
+
+        input = self._coord_input.focus()
         input.border_subtitle = f"(1-{self.max_row}:1-{self.max_col})"
 
     def on_input_submitted(self, event: Input.Submitted) -> None:
@@ -40,8 +49,8 @@ class CoordInputScreen(ModalScreen[tuple[int, int] | None]):
 
     def validate_and_navigate(self) -> None:
         """Validate input and navigate if valid."""
-        coord_input = self.query_one("#coord_input", Input)
-        error_msg = self.query_one("#error_message", Static)
+        coord_input = self._coord_input
+        error_msg = self._error_msg
 
         value = coord_input.value.strip()
 
@@ -50,37 +59,32 @@ class CoordInputScreen(ModalScreen[tuple[int, int] | None]):
             return
 
         # Parse the input
-        if ":" not in value:
-            error_msg.update("Format must be ROW:COL")
-            return
-
-        parts = value.split(":")
-        if len(parts) != 2:
-            error_msg.update("Format must be ROW:COL")
+        match = _COORD_RE.match(value)
+        if match is None:
+            if value.count(":") != 1:
+                error_msg.update("Format must be ROW:COL")
+            else:
+                error_msg.update("Please enter valid numbers (e.g., 12:3)")
             return
 
-        try:
-            row_str, col_str = parts
-            row = int(row_str.strip()) - 1 if row_str.strip() else None
-            col = int(col_str.strip()) - 1 if col_str.strip() else None
-            # DataTable indexes starts at 0 so we have to substract by 1 to be consistent with the rows index (start at 1)
+        row_str, col_str = match.groups()
+        row = int(row_str) - 1 if row_str else None
+        col = int(col_str) - 1 if col_str else None
+        # DataTable indexes starts at 0 so we have to substract by 1 to be consistent with the rows index (start at 1)
 
-            # Validate that at least one is provided
-            if row is None and col is None:
-                error_msg.update("Please enter at least row or column")
-                return
-
-            # Validate ranges
-            if row is not None and (row < 0 or row > self.max_row):
-                error_msg.update(f"Row must be between 1 and {self.max_row}")
-                return
+        # Validate that at least one is provided
+        if row is None and col is None:
+            error_msg.update("Please enter at least row or column")
+            return
 
-            if col is not None and (col < 0 or col > self.max_col):
-                error_msg.update(f"Column must be between 1 and {self.max_col}")
-                return
+        # Validate ranges
+        if row is not None and (row < 0 or row > self.max_row):
+            error_msg.update(f"Row must be between 1 and {self.max_row}")
+            return
 
-            # Valid input - dismiss with coordinates
-            self.dismiss((row, col))
+        if col is not None and (col < 0 or col > self.max_col):
+            error_msg.update(f"Column must be between 1 and {self.max_col}")
+            return
 
-        except ValueError:
-            error_msg.update("Please enter valid numbers (e.g., 12:3)")
+        # Valid input - dismiss with coordinates
+        self.dismiss((row, col))
@@ -1,23 +1,58 @@
+from functools import lru_cache
 from typing import Literal
 
+from rich.text import Text
 from textual import events
 from textual.app import App, ComposeResult
 from textual.binding import Binding
 from textual.containers import Vertical
+from textual.coordinate import Coordinate
 from textual.widgets import DataTable, Footer, Header, Input
+from textual.widgets.data_table import ColumnKey, RowKey
 
 from .data_model import CSVDataModel
 from .helpers import (
+    StaleRows,
+    cell_text,
     col_label_spreasheet_format,
 )
 from .screens.goto_cell_screen import CoordInputScreen
 
+# rows are added to the DataTable by batch, when they are about to be displayed
+# (at least ROW_BATCH_SIZE rows, or two screens of rows on tall terminals)
+ROW_BATCH_SIZE = 200
+# the formula bar follows the cursor at most once per frame (~60 Hz)
+HIGHLIGHT_DELAY = 1 / 60
+# actions hidden from the footer (and disabled) while a cell is edited
+_EDIT_HIDDEN = frozenset({"goto_cell", "edit_cell", "save", "reload"})
+# actions disabled while the csv is loading
+_NEEDS_DATA = frozenset(
+    {
+        "save",
+        "reload",
+        "edit_cell",
+        "copy_cell",
+        "goto_cell",
+        "insert_new_row_below_cursor",
+        "insert_new_col_right_cursor",
+        "delete_row",
+        "delete_column",
+    }
+)
+
+
+@lru_cache(maxsize=4096)
+def _row_label(row_idx: int) -> Text:
+    """Row label (row number, starts at 1). Built once per number"""
+    return Text(str(row_idx + 1), end="")
+
 
 ##-----Textual app-----##
 class CSVEditorApp(App):
     """A Textual app to view and edit CSV files"""
 
     CSS_PATH = "csv_ve.tcss"
+    TITLE = "CSV-VE"
     BINDINGS = [
         Binding("q", "quit", "Quit"),
         Binding("ctrl+s", "save", "Save"),
@@ -43,8 +78,24 @@ class CSVEditorApp(App):
     def __init__(self, csv_path: str, theme: str | None):
         super().__init__()
         self.csv_path = csv_path
-        self.data_model = CSVDataModel(csv_path)
+        # the csv is parsed in a worker once the app is mounted (see _load_csv)
+        self.data_model: CSVDataModel | None = None
         self.theme = theme or "catppuccin-mocha"
+        self.sub_title = f"Loading {csv_path}..."
+        self._loaded_rows = 0  # rows of the dataframe currently in the DataTable
+        # size of the dataframe, kept up to date by the table actions
+        self._n_rows = 0
+        self._n_cols = 0
+        self._col_keys: list[ColumnKey] = []  # column keys, in table order
+        self._col_key_to_idx: dict[str, int] = {}  # column key (name) -> column index
+        self._stale_labels = StaleRows()  # loaded rows with an outdated label
+        self._stale_cells = StaleRows()  # loaded rows with outdated cells
+        # last highlighted cell value and its text, for the formula bar
+        self._last_highlighted: tuple[object, str] | None = None
+        # highlighted cell waiting to be shown in the formula bar
+        self._highlight_pending: Coordinate | None = None
+        # (row key, column key, original value) of the cell edited in the formula bar
+        self.editing_cell: tuple[RowKey, ColumnKey, object] | None = None
 
     def compose(self) -> ComposeResult:
         yield Header(icon="􀝥")
@@ -60,8 +111,34 @@ class CSVEditorApp(App):
 
     def on_mount(self) -> None:
         """Load data when app starts"""
-        self.title = "CSV-VE"
+        # widgets are created once in compose: look them up once instead of in every handler
+        self._table = self.query_one(DataTable)
+        self._formula_bar = self.query_one("#formula_bar", Input)
+        self._header = self.query_one(Header)
+
+        self.watch(self._table, "scroll_y", self._on_table_scroll, init=False)
+        self.run_worker(self._load_csv, thread=True, exclusive=True)
+
+    def _load_csv(self) -> None:
+        """Parse the csv in a worker thread, then fill the table on the UI thread"""
+        try:
+            data_model = CSVDataModel(self.csv_path)
+        except Exception as e:
+            self.call_from_thread(self._on_load_failed, e)
+            return
+        self.call_from_thread(self._on_data_loaded, data_model)
+
+    def _on_data_loaded(self, data_model: CSVDataModel) -> None:
+        """Show the loaded csv"""
+        self.data_model = data_model
         self.load_data()
+        self.refresh_bindings()  # show the actions hidden while loading (see check_action)
+
+    def _on_load_failed(self, error: Exception) -> None:
+        """Report a csv that could not be loaded"""
+        self.sub_title = "No data loaded"
+        self.notify(str(error), severity="error")
+        self.refresh_bindings()
 
     # ----cursor---- #
 
@@ -108,6 +185,7 @@ class CSVEditorApp(App):
 
     def action_table_bottom(self):
         if isinstance(self.focused, DataTable):
+            self._ensure_rows_loaded(self._n_rows - 1)
             self.focused.action_scroll_bottom()
 
     def action_table_top(self):
@@ -116,29 +194,165 @@ class CSVEditorApp(App):
 
     # ---file/ table actions--- #
     def load_data(self) -> None:
-        """Load CSV data into the DataTable"""
-        table = self.query_one(DataTable)
+        """
+        Load CSV data into the DataTable
+        Only the first batch of rows is added, the rest follows when scrolling down
+        """
+        table = self._table
         table.clear(columns=True)
+        self._loaded_rows = 0
+        self._stale_labels.clear()
+        self._stale_cells.clear()
 
         df = self.data_model.df
 
         # set header to receive loaded data info (file name, col and row count)
-        header = self.query_one(Header)
+        header = self._header
         header.tall = False
 
         if df is None:
+            self._n_rows = self._n_cols = 0
             self.sub_title = str("No data loaded")
             return
 
+        self._n_rows, self._n_cols = df.shape
+
         # Add columns and rows
-        for i, col_name in enumerate(df.columns):
-            labeled_col_name = f"{col_label_spreasheet_format(i)}\n{col_name}"
-            table.add_column(labeled_col_name, key=col_name, width=30)
-        for i, row in enumerate(df.iter_rows()):
-            table.add_row(*row, label=f"{i + 1}")
+        columns = df.columns
+        labels = [self._column_label(i, col_name) for i, col_name in enumerate(columns)]
+        self._col_keys = [
+            table.add_column(label, key=col_name, width=30)
+            for col_name, label in zip(columns, labels)
+        ]
+        self._col_key_to_idx = {col_name: i for i, col_name in enumerate(columns)}
+        self._ensure_rows_loaded(0)
+
+        self._update_sub_title()
+
+    def _update_sub_title(self) -> None:
+        """Update header with file info"""
+        self.sub_title = f"{self.csv_path} | {self._n_rows} rows × {self._n_cols} cols"
+
+    @staticmethod
+    def _column_label(col_idx: int, col_name: str) -> str:
+        """Column header: spreadsheet letter on top of the column name"""
+        return f"{col_label_spreasheet_format(col_idx)}\n{col_name}"
+
+    def _update_row_indices(self, start: int = 0) -> None:
+        """
+        Renumber the row labels from 'start' (rows below a removed row move up).
+        Only the rows on screen are renumbered now, the others when they are scrolled into view
+        """
+        self._stale_labels.mark(start, self._loaded_rows)
+        self._update_visible_row_indices()
+
+    def _update_visible_row_indices(self) -> None:
+        """Renumber the outdated row labels that are on screen"""
+        table = self._table
+        top = int(table.scroll_y)
+        ranges = self._stale_labels.take(top, top + table.size.height)
+        if not ranges:
+            return
 
-        # Update header with file info
-        self.sub_title = f"{self.csv_path} | {len(df)} rows × {len(df.columns)} cols"
+        # look up the on-screen rows only (ordered_rows would list every loaded row again
+        # after each change of the table)
+        rows = table.rows
+        coordinate_to_cell_key = table.coordinate_to_cell_key
+        for start, end in ranges:
+            for i in range(start, end):
+                row_key, _ = coordinate_to_cell_key(Coordinate(i, 0))
+                rows[row_key].label = _row_label(i)
+        table.refresh()
+
+    def _update_column_labels(self, start: int = 0) -> None:
+        """Rewrite the column headers from 'start' (letters shift when a column is removed)"""
+        table = self._table
+        for i, column in enumerate(table.ordered_columns[start:], start=start):
+            column.label = Text.from_markup(
+                self._column_label(i, str(column.key.value))
+            )
+        table.refresh()
+
+    def _update_row_cells(self, start: int) -> None:
+        """
+        Rewrite the cells of the loaded rows from 'start' (rows below an inserted row move down).
+        Only the rows on screen are rewritten now, the others when they are scrolled into view
+        or read (see _get_cell_at)
+        """
+        self._stale_cells.mark(start, self._loaded_rows)
+        self._update_visible_row_cells()
+
+    def _update_visible_row_cells(self) -> None:
+        """Rewrite the outdated cells of the rows on screen"""
+        table = self._table
+        top = int(table.scroll_y)
+        for start, end in self._stale_cells.take(top, top + table.size.height):
+            self._write_row_cells(start, end)
+
+    def _write_row_cells(self, start: int, end: int) -> None:
+        """Write the values of the dataframe in the loaded rows from 'start' to 'end' (excluded)"""
+        table = self._table
+        column_keys = self._col_keys
+        coordinate_to_cell_key = table.coordinate_to_cell_key
+        rows = self.data_model.iter_rows(start, end - start)
+        for i, row_values in enumerate(rows, start=start):
+            row_key, _ = coordinate_to_cell_key(Coordinate(i, 0))
+            for col_key, value in zip(column_keys, row_values):
+                table.update_cell(row_key, col_key, value)
+
+    def _get_cell_at(self, coordinate: Coordinate) -> object:
+        """Value of a loaded cell (its row is rewritten first if it is outdated)"""
+        row = coordinate.row
+        for start, end in self._stale_cells.take(row, row + 1):
+            self._write_row_cells(start, end)
+        return self._table.get_cell_at(coordinate)
+
+    def _ensure_rows_loaded(self, row: int) -> None:
+        """
+        Make sure the DataTable holds the rows of the dataframe up to 'row' (included).
+        Rows are appended by batch (see _row_batch_size), starting after the last loaded row
+        """
+        if row < self._loaded_rows:
+            return
+
+        self._append_rows(max(row + 1, self._loaded_rows + self._row_batch_size()))
+
+    def _row_batch_size(self) -> int:
+        """Number of rows appended at once: ROW_BATCH_SIZE or two screens of rows"""
+        return max(ROW_BATCH_SIZE, 2 * self._table.size.height)
+
+    def _append_rows(self, end: int) -> None:
+        """Append the rows of the dataframe from the last loaded row up to 'end' (excluded)"""
+        table = self._table
+        start = self._loaded_rows
+        end = min(self._n_rows, end)
+        if end <= start:
+            return
+
+        # add_rows() takes no labels: add the rows one by one with a bound add_row
+        # and the labels of the whole batch
+        add_row = table.add_row
+        rows = self.data_model.iter_rows(start, end - start)
+        labels = map(_row_label, range(start, end))
+        for row_values, label in zip(rows, labels):
+            add_row(*row_values, label=label)
+
+        self._loaded_rows = end
+
+    def _on_table_scroll(self, scroll_y: float) -> None:
+        """
+        - renumber the rows scrolled into view if their labels are outdated
+        - rewrite the rows scrolled into view if their cells are outdated
+        - load the next batch of rows when the view gets close to the last loaded row
+        """
+        self._update_visible_row_indices()
+        self._update_visible_row_cells()
+        table = self._table
+        if (
+            scroll_y + table.size.height
+            >= self._loaded_rows - self._row_batch_size() // 2
+        ):
+            self._ensure_rows_loaded(self._loaded_rows)
 
     def action_save(self) -> None:
         """Save the CSV file"""
@@ -158,53 +372,85 @@ class CSVEditorApp(App):
             self.notify(f"Reload failed: {e}", severity="error")
 
     def on_data_table_cell_highlighted(self, event: DataTable.CellHighlighted) -> None:
-        """Update formula bar when cursor moves to a new cell"""
-        table = self.query_one(DataTable)
-        formula_bar = self.query_one("#formula_bar", Input)
+        """
+        Update formula bar when cursor moves to a new cell.
+        Successive moves within HIGHLIGHT_DELAY are coalesced: only the last cell is shown
+        """
+        self._queue_highlight(event.coordinate)
+
+    def _queue_highlight(self, coordinate: Coordinate) -> None:
+        """Show the cell in the formula bar after HIGHLIGHT_DELAY"""
+        if self._highlight_pending is None:
+            self.set_timer(HIGHLIGHT_DELAY, self._flush_highlight)
+        self._highlight_pending = coordinate
+
+    def _flush_highlight(self) -> None:
+        """Show the value of the last highlighted cell in the formula bar"""
+        coordinate = self._highlight_pending
+        self._highlight_pending = None
+        if coordinate is None:
+            return
 
-        # Get the value of the highlighted cell
-        try:
-            current_value = table.get_cell_at(event.coordinate)
-            formula_bar.value = str(current_value)
-        except Exception:
-            # Handle case where cell might not exist
+        table = self._table
+        formula_bar = self._formula_bar
+
+        # the cell might not exist anymore (e.g. the table was cleared)
+        if not table.is_valid_coordinate(coordinate):
             formula_bar.value = ""
+            return
+
+        # Get the value of the highlighted cell
+        current_value = self._get_cell_at(coordinate)
+
+        # convert the value only if it is not the one converted last time
+        # (cell values are immutable: same object, same text)
+        last = self._last_highlighted
+        if last is None or last[0] is not current_value:
+            last = self._last_highlighted = (current_value, cell_text(current_value))
+
+        # redraw the formula bar only if its text changes
+        if formula_bar.value != last[1]:
+            formula_bar.value = last[1]
 
     def action_copy_cell(self) -> None:
-        table = self.query_one(DataTable)
-        if table.cursor_coordinate is None:
+        table = self._table
+        if not table.is_valid_coordinate(table.cursor_coordinate):
             return
-        row_key, column_key = table.coordinate_to_cell_key(table.cursor_coordinate)
 
-        cell_value = table.get_cell(row_key, column_key)
-        self.copy_to_clipboard(str(cell_value))
+        cell_value = self._get_cell_at(table.cursor_coordinate)
+        self.copy_to_clipboard(cell_text(cell_value))
 
     # ---edit data actions--- #
     def action_edit_cell(self) -> None:
         """Start editing selected cell in formula bar"""
-        table = self.query_one(DataTable)
-        formula_bar = self.query_one("#formula_bar", Input)
+        table = self._table
+        formula_bar = self._formula_bar
 
-        if table.cursor_coordinate is None:
+        if not table.is_valid_coordinate(table.cursor_coordinate):
             return
 
         row_key, col_key = table.coordinate_to_cell_key(table.cursor_coordinate)
-        current_value = table.get_cell(row_key, col_key)
+        current_value = self._get_cell_at(table.cursor_coordinate)
 
         # Populate formula bar with current value
         self.editing_cell = (row_key, col_key, current_value)
-        formula_bar.value = str(current_value)
+        formula_bar.value = cell_text(current_value)
         formula_bar.focus()
 
     def on_input_submitted(self, event: Input.Submitted) -> None:
-        if event.input.id == "formula_bar" and hasattr(self, "editing_cell"):
+        if event.input.id == "formula_bar" and self.editing_cell is not None:
             row_key, col_key, _ = self.editing_cell
-            table = self.query_one(DataTable)
+            table = self._table
 
             row_idx = table.get_row_index(row_key)
-            col_idx = list(table.columns.keys()).index(col_key)
-
-            self.data_model.set_cell(row_idx, col_idx, event.value)
+            col_idx = self._col_key_to_idx[col_key]
+
+            try:
+                self.data_model.set_cell(row_idx, col_idx, event.value)
+            except TypeError as e:
+                # stay in edit mode so the value can be corrected
+                self.notify(str(e), severity="error")
+                return
             table.update_cell(row_key, col_key, event.value)
 
             self._clear_edit_state(table)
@@ -215,13 +461,17 @@ class CSVEditorApp(App):
         - Cancel the edit if formula bar is the focus
         - set cell cursor to 'cell' if formula bar is not the focus (if already cell cursor do nothing)
         """
+        # other keys are handled by the bindings and the focused widget
+        if event.key not in ("escape", "enter"):
+            return
+
         # escape key
-        formula_bar = self.query_one("#formula_bar", Input)
-        table = self.query_one(DataTable)
+        formula_bar = self._formula_bar
+        table = self._table
         if (
             event.key == "escape"
             and formula_bar.has_focus
-            and hasattr(self, "editing_cell")
+            and self.editing_cell is not None
         ):
             row_key, col_key, original_value = self.editing_cell
             # Restore original value if it was modified
@@ -234,30 +484,30 @@ class CSVEditorApp(App):
         # enter key
         if (
             event.key == "enter" and not formula_bar.has_focus
-            # and hasattr(self, "editing_cell")
+            # and self.editing_cell is not None
         ):
             event.stop()
 
     def _clear_edit_state(self, table: DataTable) -> None:
         """Helper to clean up after edit completion or cancelation"""
-        formula_bar = self.query_one("#formula_bar", Input)
+        formula_bar = self._formula_bar
         formula_bar.value = ""
         table.focus()
-        if hasattr(self, "editing_cell"):
-            delattr(self, "editing_cell")
+        self.editing_cell = None
 
     def check_action(self, action: str, parameters: tuple[object, ...]) -> bool | None:
         """
         Show/ hide keybindings in the footer.
         - show only escape keybinding in edit mode
         - hide goto_cell, enter, save, reload keybinding in edit mode
+        - hide the data actions while the csv is loading
         """
-        formula_bar = self.query_one("#formula_bar", Input)
-
+        if self.data_model is None and action in _NEEDS_DATA:
+            return False
         if action == "cancel_edit":
-            return hasattr(self, "editing_cell")
-        if action in {"goto_cell", "edit_cell", "save", "reload"}:
-            return not formula_bar.has_focus
+            return self.editing_cell is not None
+        if action in _EDIT_HIDDEN:
+            return not self._formula_bar.has_focus
         return True
 
     # ---add row and cols actions---#
@@ -266,12 +516,14 @@ class CSVEditorApp(App):
         Insert a new empty row below the current cursor position.
         Uses CSVDataModel (that uses polars) to create the new row (textual only reads - the file is the source of thruth)
         - insert the new row in the data model (polars)
-        - reload the table (textual)
+        - update the loaded rows of the table (textual): the DataTable can only append rows,
+          so one row is appended at the bottom and the rows below the cursor are shifted down
+          (on screen now, the others when they are displayed)
         - move the cursor back to the original position so it appears like it didn't move
         """
-        table = self.query_one(DataTable)
+        table = self._table
 
-        if table.cursor_coordinate is None:
+        if not table.is_valid_coordinate(table.cursor_coordinate):
             return
 
         row, col = table.cursor_coordinate
@@ -282,23 +534,30 @@ class CSVEditorApp(App):
             self.notify(f"Failed to insert row: {e}", severity="error")
             return
 
-        self.load_data()  # reset cursor position to the first row (by default)
+        self._n_rows += 1
+        self._append_rows(self._loaded_rows + 1)  # the row pushed down from the bottom
+        self._update_row_cells(row + 1)
+        self._update_sub_title()
 
         # Restore cursor to its position
-        new_row = min(row + 1, self.data_model.row_count() - 1)
+        new_row = min(row + 1, self._n_rows - 1)
+        self._ensure_rows_loaded(new_row)
         table.move_cursor(row=new_row, column=col)
+        # the cell under the cursor changed even if the cursor did not move
+        self._queue_highlight(table.cursor_coordinate)
 
     def action_insert_new_col_right_cursor(self) -> None:
         """
         Insert a new empty column to the right of the current cursor position.
         Uses CSVDataModel (that uses polars) to create the new column
         - insert the new column in the data model (polars)
-        - reload the table (textual)
+        - rebuild the loaded rows of the table (textual): the DataTable can only append columns,
+          and appending one re-measures every loaded cell, which is slower than a rebuild
         - move the cursor back to the original position so it appears like it didn't move
         """
-        table = self.query_one(DataTable)
+        table = self._table
 
-        if table.cursor_coordinate is None:
+        if not table.is_valid_column_index(table.cursor_column):
             return
 
         row, col = table.cursor_coordinate
@@ -309,10 +568,14 @@ class CSVEditorApp(App):
             self.notify(f"Failed to insert column: {e}", severity="error")
             return
 
-        self.load_data()  # reset cursor position to the first cell (by default)
+        loaded_rows = self._loaded_rows
+        # reset cursor position to the first cell (by default) and rebuild the column keys
+        self.load_data()
+        self._ensure_rows_loaded(loaded_rows - 1)
 
         # Restore cursor to its position
-        new_col = min(col + 1, self.data_model.column_count() - 1)
+        new_col = min(col + 1, self._n_cols - 1)
+        self._ensure_rows_loaded(row)
         table.move_cursor(row=row, column=new_col)
 
     # ---remove row or col--- #
@@ -320,12 +583,13 @@ class CSVEditorApp(App):
         """
         Delete the row at the current cursor position.
         """
-        table = self.query_one(DataTable)
+        table = self._table
 
-        if table.cursor_coordinate is None:
+        if not table.is_valid_coordinate(table.cursor_coordinate):
             return
 
         row, col = table.cursor_coordinate
+        row_key, _ = table.coordinate_to_cell_key(table.cursor_coordinate)
 
         try:
             self.data_model.delete_row(row)
@@ -336,22 +600,35 @@ class CSVEditorApp(App):
             self.notify(f"Failed to delete row: {e}", severity="error")
             return
 
-        self.load_data()
+        table.remove_row(row_key)
+        self._n_rows -= 1
+        self._loaded_rows -= 1
+        # the outdated rows below move up with the others
+        self._stale_cells.remove(row)
+        self._stale_labels.remove(row)
+        self._update_visible_row_cells()
+        self._update_row_indices(row)
+        self._update_sub_title()
 
         # Move cursor to the same row (or the last row if we deleted the last one)
-        new_row = min(row, self.data_model.row_count() - 1)
+        new_row = min(row, self._n_rows - 1)
+        self._ensure_rows_loaded(new_row)
         table.move_cursor(row=new_row, column=col)
+        # the cell under the cursor changed even if the cursor did not move
+        self._queue_highlight(table.cursor_coordinate)
 
     def action_delete_column(self) -> None:
         """
         Delete the column at the current cursor position.
         """
-        table = self.query_one(DataTable)
+        table = self._table
 
-        if table.cursor_coordinate is None:
+        if not table.is_valid_column_index(table.cursor_column):
             return
 
         row, col = table.cursor_coordinate
+        # from the column keys: there is no cell to read it from if there are no rows
+        col_key = self._col_keys[col]
 
         try:
             self.data_model.delete_column(col)
@@ -362,18 +639,29 @@ class CSVEditorApp(App):
             self.notify(f"Failed to delete column: {e}", severity="error")
             return
 
-        self.load_data()
+        table.remove_column(col_key)
+        self._n_cols -= 1
+        self._update_column_labels(col)
+        del self._col_keys[col]
+        del self._col_key_to_idx[col_key]
+        for key, idx in self._col_key_to_idx.items():
+            if idx > col:
+                self._col_key_to_idx[key] = idx - 1
+        self._update_sub_title()
 
         # Move cursor to the same column (or the last column if we deleted the last one)
-        new_col = min(col, self.data_model.column_count() - 1)
+        new_col = min(col, self._n_cols - 1)
+        self._ensure_rows_loaded(row)
         table.move_cursor(row=row, column=new_col)
+        # the cell under the cursor changed even if the cursor did not move
+        self._queue_highlight(table.cursor_coordinate)
 
     # ---jump to specific cell--- #
     def action_goto_cell(self) -> None:
         """Open the navigation popup."""
-        table = self.query_one(DataTable)
-        max_row = table.row_count
-        max_col = len(table.columns)
+        table = self._table
+        max_row = self._n_rows  # the table may not hold every row yet
+        max_col = self._n_cols
 
         def handle_navigation(result: tuple[int, int] | None) -> None:
             if result is not None:
@@ -387,6 +675,7 @@ class CSVEditorApp(App):
                 target_col = col if col is not None else current_col
 
                 # Move cursor to the specified cell
+                self._ensure_rows_loaded(target_row)
                 table.move_cursor(row=target_row, column=target_col)
                 table.focus()
 